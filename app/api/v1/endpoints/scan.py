@@ -1,26 +1,65 @@
 from fastapi import APIRouter, UploadFile, File, HTTPException, status
+import asyncio
+import blake3
 import os
 import tempfile
 import shutil
 import logging
 import time
-from typing import Dict, Any
+from collections import OrderedDict
+from typing import Dict, Any, List, Optional, Tuple
 from app.services.semgrep_service import run_semgrep
-from app.services.supabase_service import store_scan_results, get_scan_history, get_scan_by_id
-from app.core.security import calculate_security_score, count_severities
-from app.core.config import get_settings
+from app.services.supabase_service import store_scan_results, store_scan_results_bulk, get_scan_history, get_scan_by_id, get_scan_by_content_hash
+from app.core.security import summarize
+from app.core.config import settings
 from app.services.owasp_service import owasp_service
 from pydantic import BaseModel
 
 logger = logging.getLogger(__name__)
-settings = get_settings()
 
 router = APIRouter()
 
+# Chunk size for buffered upload copies
+COPY_CHUNK_SIZE = 1024 * 1024
+
+# Scan metrics kept per (content hash, scan mode, semgrep config) so re-uploads of the
+# same file skip semgrep; the extension and ruleset both change what a scan finds
+CACHED_SCAN_FIELDS = ("vulnerabilities", "severity_count", "total_vulnerabilities", "security_score")
+scan_cache: "OrderedDict[Tuple[str, str, str], Dict[str, Any]]" = OrderedDict()
+
 class DASTScanRequest(BaseModel):
     target_url: str
 
-def process_upload(file: UploadFile) -> Dict[str, Any]:
+def save_upload(file: UploadFile, file_path: str) -> str:
+    """Write the uploaded file to file_path and return the hex digest of its contents."""
+    # BLAKE3 hashes with SIMD across threads, keeping up with the disk write
+    hasher = blake3.blake3(max_threads=blake3.blake3.AUTO)
+    source = file.file
+    with open(file_path, "wb") as buffer:
+        while chunk := source.read(COPY_CHUNK_SIZE):
+            hasher.update(chunk)
+            buffer.write(chunk)
+    return hasher.hexdigest()
+
+def cache_scan(scan_key: Tuple[str, str, str], scan_results: Dict[str, Any]) -> None:
+    """Remember scan results for a scan key, evicting the least recently used entry."""
+    scan_cache[scan_key] = {field: scan_results[field] for field in CACHED_SCAN_FIELDS}
+    scan_cache.move_to_end(scan_key)
+    if len(scan_cache) > settings.SCAN_CACHE_SIZE:
+        scan_cache.popitem(last=False)
+
+async def get_cached_scan(scan_key: Tuple[str, str, str]) -> Optional[Dict[str, Any]]:
+    """Look up previous scan results for a scan key, in memory first and then in Supabase."""
+    if scan_key in scan_cache:
+        scan_cache.move_to_end(scan_key)
+        return scan_cache[scan_key]
+    
+    cached = await get_scan_by_content_hash(*scan_key)
+    if cached:
+        cache_scan(scan_key, cached)
+    return cached
+
+async def process_upload(file: UploadFile) -> Dict[str, Any]:
     """Process the uploaded file and return vulnerability results."""
     try:
         logger.info(f"Processing file: {file.filename}")
@@ -29,40 +68,60 @@ def process_upload(file: UploadFile) -> Dict[str, Any]:
         with tempfile.TemporaryDirectory() as temp_dir:
             file_path = os.path.join(temp_dir, file.filename)
             
-            with open(file_path, "wb") as buffer:
-                shutil.copyfileobj(file.file, buffer)
-            
-            if file.filename.endswith('.zip'):
-                logger.info("Extracting zip file")
-                shutil.unpack_archive(file_path, temp_dir)
-                vulnerabilities = run_semgrep(temp_dir)
-            elif file.filename.endswith('.exe'):
+            # Executables are never scanned, so they are neither staged on disk nor cached
+            if file.filename.endswith('.exe'):
                 logger.info("EXE file uploaded. Skipping static analysis.")
-                vulnerabilities = []
-            elif file.filename.endswith('.txt'):
-                vulnerabilities = run_semgrep(file_path)
+                severity_count, total_vulnerabilities, security_score = summarize([])
+                scan_results = {
+                    "vulnerabilities": [],
+                    "severity_count": severity_count,
+                    "total_vulnerabilities": total_vulnerabilities,
+                    "security_score": security_score
+                }
+                scan_identity = {}
             else:
-                vulnerabilities = run_semgrep(file_path)
+                # Blocking file I/O runs in a worker thread to keep the event loop free
+                content_hash = await asyncio.to_thread(save_upload, file, file_path)
+                scan_mode = os.path.splitext(file.filename)[1]
+                scan_key = (content_hash, scan_mode, settings.SEMGREP_CONFIG)
+                scan_identity = {
+                    "content_hash": content_hash,
+                    "scan_mode": scan_mode,
+                    "semgrep_config": settings.SEMGREP_CONFIG
+                }
+                
+                scan_results = await get_cached_scan(scan_key)
+                if scan_results:
+                    logger.info(f"Reusing previous scan results for {file.filename}")
+                else:
+                    if file.filename.endswith('.zip'):
+                        logger.info("Extracting zip file")
+                        await asyncio.to_thread(shutil.unpack_archive, file_path, temp_dir)
+                        vulnerabilities, severity_codes = await run_semgrep(temp_dir)
+                    elif file.filename.endswith('.txt'):
+                        vulnerabilities, severity_codes = await run_semgrep(file_path)
+                    else:
+                        vulnerabilities, severity_codes = await run_semgrep(file_path)
 
-            # Ensure top-level severity field for each vulnerability
-            for vuln in vulnerabilities:
-                vuln['severity'] = vuln.get('extra', {}).get('severity', 'info')
-
-            # Calculate metrics
-            severity_count = count_severities(vulnerabilities)
-            total_vulnerabilities = len(vulnerabilities)
-            security_score = calculate_security_score(vulnerabilities)
+                    # Calculate metrics
+                    severity_count, total_vulnerabilities, security_score = summarize(severity_codes)
+                    
+                    scan_results = {
+                        "vulnerabilities": vulnerabilities,
+                        "severity_count": severity_count,
+                        "total_vulnerabilities": total_vulnerabilities,
+                        "security_score": security_score
+                    }
+                    cache_scan(scan_key, scan_results)
             
             scan_duration = time.time() - start_time
             
             return {
-                "vulnerabilities": vulnerabilities,
-                "severity_count": severity_count,
-                "total_vulnerabilities": total_vulnerabilities,
-                "security_score": security_score,
+                **scan_results,
                 "scan_duration": scan_duration,
                 "tool_version": "semgrep-latest",
-                "environment": os.getenv("ENVIRONMENT", "development")
+                "environment": os.getenv("ENVIRONMENT", "development"),
+                **scan_identity
             }
             
     except Exception as e:
@@ -72,31 +131,62 @@ def process_upload(file: UploadFile) -> Dict[str, Any]:
             detail=str(e)
         )
 
+async def scan_and_store(file: UploadFile) -> Dict[str, Any]:
+    """Scan a single uploaded file and store its results in Supabase."""
+    # Process file and get scan results
+    scan_results = await process_upload(file)
+    
+    # Prepare data for Supabase
+    data = {
+        "file_name": file.filename,
+        **scan_results
+    }
+    
+    # Store results in Supabase
+    stored_result = await store_scan_results(data)
+    
+    return {
+        **scan_results,
+        "scan_id": stored_result["id"]
+    }
+
 @router.post("/upload")
 async def upload_file(file: UploadFile = File(...)):
     """Handle file upload, run SAST scan, and store results in Supabase."""
     try:
         logger.info(f"Starting upload process for file: {file.filename}")
+        return await scan_and_store(file)
         
-        # Process file and get scan results
-        scan_results = process_upload(file)
+    except Exception as e:
+        logger.error(f"Error in upload_file: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=str(e)
+        )
+
+@router.post("/upload/batch")
+async def upload_files(files: List[UploadFile] = File(...)):
+    """Handle multiple file uploads, scanning them concurrently."""
+    try:
+        logger.info(f"Starting batch upload process for {len(files)} files")
         
-        # Prepare data for Supabase
-        data = {
-            "file_name": file.filename,
-            **scan_results
-        }
+        # Scans run concurrently, bounded by the semgrep scan semaphore;
+        # gather preserves the order of the uploaded files
+        scan_results = await asyncio.gather(*(process_upload(file) for file in files))
         
-        # Store results in Supabase
-        stored_result = store_scan_results(data)
+        # Store all results in Supabase with a single insert
+        stored_results = await store_scan_results_bulk([
+            {"file_name": file.filename, **results}
+            for file, results in zip(files, scan_results)
+        ])
         
-        return {
-            **scan_results,
-            "scan_id": stored_result["id"]
-        }
+        return [
+            {**results, "scan_id": stored_result["id"]}
+            for results, stored_result in zip(scan_results, stored_results)
+        ]
         
     except Exception as e:
-        logger.error(f"Error in upload_file: {str(e)}")
+        logger.error(f"Error in upload_files: {str(e)}")
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=str(e)
@@ -106,7 +196,7 @@ async def upload_file(file: UploadFile = File(...)):
 async def get_history(limit: int = 10, offset: int = 0):
     """Retrieve scan history with pagination."""
     try:
-        return get_scan_history(limit, offset)
+        return await get_scan_history(limit, offset)
     except Exception as e:
         logger.error(f"Error retrieving scan history: {str(e)}")
         raise HTTPException(
@@ -118,7 +208,7 @@ async def get_history(limit: int = 10, offset: int = 0):
 async def get_scan(scan_id: str):
     """Retrieve a specific scan by ID."""
     try:
-        return get_scan_by_id(scan_id)
+        return await get_scan_by_id(scan_id)
     except Exception as e:
         logger.error(f"Error retrieving scan: {str(e)}")
         raise HTTPException(
@@ -131,10 +221,10 @@ async def run_dast_scan(request: DASTScanRequest):
     """Run Dynamic Application Security Testing using OWASP ZAP."""
     try:
         logger.info(f"Starting DAST scan for URL: {request.target_url}")
-        results = owasp_service.start_scan(request.target_url)
+        results = await owasp_service.start_scan(request.target_url)
         
         # Store results in Supabase
-        stored_result = store_scan_results(results)
+        stored_result = await store_scan_results(results)
         
         return {
             **results,
@@ -1,5 +1,6 @@
 from pydantic_settings import BaseSettings
 from functools import lru_cache
+from typing import Optional
 
 class Settings(BaseSettings):
     # Supabase Configuration
@@ -9,10 +10,23 @@ class Settings(BaseSettings):
     # Application Settings
     UPLOAD_DIR: str = "uploads"
     ALLOWED_EXTENSIONS: set = {".zip", ".py", ".js", ".ts", ".java", ".cpp", ".c", ".cs", ".php", ".rb", ".go", ".rs"}
+    MAX_CONCURRENT_SCANS: int = 4
+    SCAN_CACHE_SIZE: int = 128
+    
+    # Semgrep Configuration
+    # Registry rulesets (p/..., r/..., s/...) are downloaded once at startup; a local rules
+    # file or directory skips the registry entirely
+    SEMGREP_CONFIG: str = "auto"
+    # Worker processes per semgrep scan; defaults to the CPU count, lower it to avoid
+    # oversubscribing cores when several scans run at once
+    SEMGREP_JOBS: Optional[int] = None
     
     class Config:
         env_file = ".env"
 
-@lru_cache()
+@lru_cache(maxsize=1)
 def get_settings():
-    return Settings() 
\ No newline at end of file
+    return Settings()
+
+# Shared settings instance for the whole process
+settings = get_settings()
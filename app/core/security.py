@@ -1,53 +1,50 @@
 from fastapi import HTTPException, status
-from typing import List, Dict
+from typing import Any, Dict, Sequence, Tuple
 import logging
+import numpy as np
 
 logger = logging.getLogger(__name__)
 
-def calculate_security_score(vulnerabilities: List[Dict]) -> int:
-    """Calculate security score based on vulnerabilities."""
+# Canonical severity levels, indexed by severity code
+SEVERITY_LEVELS = ("ERROR", "WARNING", "INFO")
+SEVERITY_CODES = {severity: code for code, severity in enumerate(SEVERITY_LEVELS)}
+INFO_CODE = SEVERITY_CODES["INFO"]
+
+# Point deductions for each severity code
+POINT_DEDUCTIONS = np.array([
+    2.0,  # ERROR - most severe: -2 points each
+    1.0,  # WARNING - medium severity: -1 point each
+    0.4   # INFO - least severe: -0.4 points each
+])
+
+def severity_code(severity: Any) -> int:
+    """Map a severity string to its code, treating unknown severities as INFO."""
+    if not isinstance(severity, str):
+        return INFO_CODE
+    return SEVERITY_CODES.get(severity.upper(), INFO_CODE)
+
+def summarize(codes: Sequence[int]) -> Tuple[Dict[str, int], int, int]:
+    """Count vulnerabilities by severity code and calculate the security score.
+
+    Returns a tuple of (severity counts, total vulnerabilities, security score).
+    """
     try:
-        # Point deductions for each severity level
-        point_deductions = {
-            "ERROR": 2.0,    # Most severe: -2 points each
-            "WARNING": 1.0,  # Medium severity: -1 point each
-            "INFO": 0.4      # Least severe: -0.4 points each
-        }
+        if len(codes) == 0:
+            return dict.fromkeys(SEVERITY_LEVELS, 0), 0, 10  # Perfect score if no vulnerabilities
         
-        if not vulnerabilities:
-            return 10  # Perfect score if no vulnerabilities
-            
-        # Calculate base score (starts at 10)
-        base_score = 10.0
+        codes = np.asarray(codes, dtype=np.uint8)
+        counts = np.bincount(codes, minlength=len(SEVERITY_LEVELS))
         
-        # Deduct points based on severity
-        for vuln in vulnerabilities:
-            severity = vuln.get("severity", "INFO").upper()
-            deduction = point_deductions.get(severity, 0.4)  # Default to INFO deduction if unknown
-            base_score -= deduction
-            
-        # Ensure score is between 0 and 10
+        # Calculate score (starts at 10) from the per-severity counts, which avoids
+        # materializing a deduction per finding, and ensure it is between 0 and 10
+        base_score = 10.0 - float(counts @ POINT_DEDUCTIONS)
         security_score = max(0, min(10, base_score))
         
-        return int(round(security_score))
+        severity_count = {severity: int(count) for severity, count in zip(SEVERITY_LEVELS, counts)}
+        return severity_count, int(codes.size), int(round(security_score))
     except Exception as e:
-        logger.error(f"Error calculating security score: {str(e)}")
+        logger.error(f"Error summarizing vulnerabilities: {str(e)}")
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail="Error calculating security score"
+            detail="Error summarizing vulnerabilities"
         )
-
-def count_severities(vulnerabilities: List[Dict]) -> Dict[str, int]:
-    """Count vulnerabilities by severity."""
-    try:
-        severities = {"ERROR": 0, "WARNING": 0, "INFO": 0}
-        for vuln in vulnerabilities:
-            sev = vuln.get('severity', 'INFO').upper()
-            severities[sev] = severities.get(sev, 0) + 1
-        return severities
-    except Exception as e:
-        logger.error(f"Error counting severities: {str(e)}")
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail="Error counting severities"
-        ) 
\ No newline at end of file
@@ -1,20 +1,21 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse
 import logging
 from app.api.v1.api import api_router
-from app.core.config import get_settings
+from app.services.owasp_service import owasp_service
+from app.services.semgrep_service import prefetch_rules, remove_prefetched_rules
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# Load settings
-settings = get_settings()
-
 app = FastAPI(
     title="SecureEngine API",
     description="API for code vulnerability scanning",
-    version="1.0.0"
+    version="1.0.0",
+    # orjson serializes large vulnerability payloads much faster than the stdlib json
+    default_response_class=ORJSONResponse
 )
 
 # Configure CORS
@@ -29,6 +30,15 @@ app.add_middleware(
 # Include API router
 app.include_router(api_router, prefix="/api/v1")
 
+@app.on_event("startup")
+async def startup():
+    await prefetch_rules()
+
+@app.on_event("shutdown")
+async def shutdown():
+    await owasp_service.close()
+    remove_prefetched_rules()
+
 @app.get("/")
 def read_root():
     return {"status": "API is running"}
@@ -1,4 +1,5 @@
-import requests
+import asyncio
+import httpx
 import time
 import logging
 from typing import Dict, Any, List
@@ -6,6 +7,18 @@ from datetime import datetime
 
 logger = logging.getLogger(__name__)
 
+# Status polling backoff bounds, in seconds
+INITIAL_POLL_DELAY = 1
+MAX_POLL_DELAY = 30
+
+# Semgrep-style severity for each ZAP risk level
+RISK_SEVERITIES = {
+    "High": "ERROR",
+    "Medium": "WARNING",
+    "Low": "INFO",
+    "Info": "INFO"
+}
+
 class OWASPService:
     def __init__(self):
         self.base_url = "http://localhost:8080"
@@ -14,98 +27,79 @@ class OWASPService:
             "X-ZAP-API-Key": self.api_key,
             "Content-Type": "application/json"
         }
+        # Shared client so requests to ZAP reuse keep-alive (and HTTP/2, over TLS) connections
+        self.client = httpx.AsyncClient(
+            base_url=self.base_url,
+            headers=self.headers,
+            http2=True,
+            timeout=30.0
+        )
 
-    def start_scan(self, target_url: str) -> Dict[str, Any]:
+    async def close(self):
+        """Close the underlying HTTP client."""
+        await self.client.aclose()
+
+    async def wait_for_completion(self, status_path: str, scan_id: str) -> None:
+        """Poll a ZAP scan status endpoint with exponential backoff until it reaches 100%."""
+        delay = INITIAL_POLL_DELAY
+        while True:
+            status_response = await self.client.get(status_path, params={"scanId": scan_id})
+            status_response.raise_for_status()
+            if status_response.json().get("status") == "100":
+                return
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, MAX_POLL_DELAY)
+
+    async def start_scan(self, target_url: str) -> Dict[str, Any]:
         """Start a new ZAP scan on the target URL."""
         try:
             start_time = time.time()
             
             # First, start the spider scan
             logger.info(f"Starting spider scan for {target_url}")
-            spider_response = requests.get(
-                f"{self.base_url}/JSON/spider/action/scan/",
-                params={"url": target_url},
-                headers=self.headers
+            spider_response = await self.client.get(
+                "/JSON/spider/action/scan/",
+                params={"url": target_url}
             )
             spider_response.raise_for_status()
             spider_id = spider_response.json().get("scan")
 
             # Wait for spider to complete
-            while True:
-                spider_status = requests.get(
-                    f"{self.base_url}/JSON/spider/view/status/",
-                    params={"scanId": spider_id},
-                    headers=self.headers
-                )
-                status = spider_status.json().get("status")
-                if status == "100":
-                    break
-                time.sleep(5)
+            await self.wait_for_completion("/JSON/spider/view/status/", spider_id)
 
             # Now start the active scan
             logger.info(f"Starting active scan for {target_url}")
-            ascan_response = requests.get(
-                f"{self.base_url}/JSON/ascan/action/scan/",
-                params={"url": target_url, "recurse": "true"},
-                headers=self.headers
+            ascan_response = await self.client.get(
+                "/JSON/ascan/action/scan/",
+                params={"url": target_url, "recurse": "true"}
             )
             ascan_response.raise_for_status()
             scan_id = ascan_response.json().get("scan")
 
             # Wait for active scan to complete
-            while True:
-                status_response = requests.get(
-                    f"{self.base_url}/JSON/ascan/view/status/",
-                    params={"scanId": scan_id},
-                    headers=self.headers
+            await self.wait_for_completion("/JSON/ascan/view/status/", scan_id)
+
+            # Get scan results and report concurrently
+            alerts_response, report_response = await asyncio.gather(
+                self.client.get(
+                    "/JSON/core/view/alerts/",
+                    params={"baseurl": target_url}
+                ),
+                self.client.get(
+                    "/OTHER/core/other/htmlreport/",
+                    params={"apikey": self.api_key}
                 )
-                status = status_response.json().get("status")
-                if status == "100":
-                    break
-                time.sleep(5)
-
-            # Get scan results
-            alerts_response = requests.get(
-                f"{self.base_url}/JSON/core/view/alerts/",
-                params={"baseurl": target_url},
-                headers=self.headers
             )
             alerts = alerts_response.json().get("alerts", [])
-
-            # Get scan report
-            report_response = requests.get(
-                f"{self.base_url}/OTHER/core/other/htmlreport/",
-                params={"apikey": self.api_key},
-                headers=self.headers
-            )
             report_html = report_response.text
 
-            # Calculate severity counts
-            severity_count = {
-                "ERROR": len([a for a in alerts if a.get("risk") == "High"]),
-                "WARNING": len([a for a in alerts if a.get("risk") == "Medium"]),
-                "INFO": len([a for a in alerts if a.get("risk") == "Low"]) + len([a for a in alerts if a.get("risk") == "Info"])
-            }
-
-            # Calculate security score (0-10)
-            total_alerts = len(alerts)
-            if total_alerts == 0:
-                security_score = 10
-            else:
-                # Weight high risk alerts more heavily
-                weighted_score = (
-                    severity_count["ERROR"] * 3 +  # High risk counts as 3
-                    severity_count["WARNING"] * 2 +  # Medium risk counts as 2
-                    severity_count["INFO"]  # Low/Info risk counts as 1
-                )
-                # Convert to 0-10 scale, where 0 is worst and 10 is best
-                security_score = max(0, round(10 - (weighted_score / total_alerts)))
-
-            scan_duration = time.time() - start_time
-
-            # Format vulnerabilities to match Semgrep format
+            # Format vulnerabilities to match Semgrep format, counting severities in the same pass
+            severity_count = {"ERROR": 0, "WARNING": 0, "INFO": 0}
             vulnerabilities = []
             for alert in alerts:
+                severity = RISK_SEVERITIES.get(alert.get("risk"))
+                if severity:
+                    severity_count[severity] += 1
                 vulnerability = {
                     "check_id": f"zap-{alert.get('pluginId', 'unknown')}",
                     "path": alert.get("url", ""),
@@ -113,7 +107,7 @@ class OWASPService:
                     "end": {"line": 0},
                     "extra": {
                         "message": alert.get("name", ""),
-                        "severity": "ERROR" if alert.get("risk") == "High" else "WARNING" if alert.get("risk") == "Medium" else "INFO",
+                        "severity": severity or "INFO",
                         "description": alert.get("description", ""),
                         "solution": alert.get("solution", ""),
                         "reference": alert.get("reference", ""),
@@ -123,6 +117,22 @@ class OWASPService:
                 }
                 vulnerabilities.append(vulnerability)
 
+            # Calculate security score (0-10)
+            total_alerts = len(alerts)
+            if total_alerts == 0:
+                security_score = 10
+            else:
+                # Weight high risk alerts more heavily
+                weighted_score = (
+                    severity_count["ERROR"] * 3 +  # High risk counts as 3
+                    severity_count["WARNING"] * 2 +  # Medium risk counts as 2
+                    severity_count["INFO"]  # Low/Info risk counts as 1
+                )
+                # Convert to 0-10 scale, where 0 is worst and 10 is best
+                security_score = max(0, round(10 - (weighted_score / total_alerts)))
+
+            scan_duration = time.time() - start_time
+
             return {
                 "scan_id": scan_id,
                 "file_name": f"dast_scan_{target_url.replace('://', '_').replace('/', '_')}",
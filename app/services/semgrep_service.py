@@ -1,45 +1,118 @@
-import subprocess
-import json
+import asyncio
+import httpx
+import ijson
 import logging
-from typing import List, Dict
+import os
+import tempfile
+from typing import List, Dict, Tuple
 from fastapi import HTTPException, status
+from app.core.config import settings
+from app.core.security import SEVERITY_LEVELS, severity_code
 
 logger = logging.getLogger(__name__)
 
-def run_semgrep(file_path: str) -> List[Dict]:
-    """Run semgrep on the given file or directory and return the results."""
+# Limit concurrent semgrep processes so parallel uploads don't exhaust host memory
+scan_semaphore = asyncio.Semaphore(settings.MAX_CONCURRENT_SCANS)
+
+# Use every core per scan; the number of semgrep processes is bounded by scan_semaphore
+semgrep_jobs = settings.SEMGREP_JOBS or os.cpu_count() or 1
+
+# Registry rulesets that can be downloaded once and reused from disk; "auto" selects
+# rules per project, so it is always resolved by semgrep itself
+REGISTRY_URL = "https://semgrep.dev/c/"
+REGISTRY_PREFIXES = ("p/", "r/", "s/")
+
+# Config passed to semgrep, replaced by a local rules file once prefetched
+semgrep_config = settings.SEMGREP_CONFIG
+
+async def prefetch_rules() -> None:
+    """Download the configured registry ruleset once so scans skip fetching it."""
+    global semgrep_config
+    if not settings.SEMGREP_CONFIG.startswith(REGISTRY_PREFIXES):
+        return
     try:
-        logger.info(f"Running semgrep on {file_path}")
-        result = subprocess.run(
-            ["semgrep", "--config", "auto", "--json", file_path],
-            capture_output=True,
-            text=True,
-            check=True
-        )
+        logger.info(f"Prefetching semgrep rules for {settings.SEMGREP_CONFIG}")
+        async with httpx.AsyncClient(timeout=60.0) as client:
+            response = await client.get(f"{REGISTRY_URL}{settings.SEMGREP_CONFIG}")
+            response.raise_for_status()
+        
+        with tempfile.NamedTemporaryFile("wb", suffix=".yaml", delete=False) as rules_file:
+            rules_file.write(response.content)
+        semgrep_config = rules_file.name
+        logger.info(f"Cached semgrep rules at {semgrep_config}")
+    except Exception as e:
+        logger.warning(f"Failed to prefetch semgrep rules, scans will fetch them instead: {str(e)}")
+
+def remove_prefetched_rules() -> None:
+    """Delete the local rules file created by prefetch_rules, if any."""
+    global semgrep_config
+    if semgrep_config != settings.SEMGREP_CONFIG:
+        try:
+            os.remove(semgrep_config)
+        except FileNotFoundError:
+            pass
+        semgrep_config = settings.SEMGREP_CONFIG
+
+async def run_semgrep(file_path: str) -> Tuple[List[Dict], List[int]]:
+    """Run semgrep on the given file or directory and return the results with their severity codes."""
+    try:
+        async with scan_semaphore:
+            logger.info(f"Running semgrep on {file_path}")
+            # Semgrep prefixes rule IDs from local config files with the file's path,
+            # which would change every check_id once rules are prefetched to a temp file
+            rule_id_args = ["--no-rewrite-rule-ids"] if os.path.isfile(semgrep_config) else []
+            proc = await asyncio.create_subprocess_exec(
+                "semgrep", "--config", semgrep_config, "--json", *rule_id_args,
+                "--disable-version-check", "--jobs", str(semgrep_jobs), file_path,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.PIPE
+            )
+            # Drain stderr concurrently so a full pipe can't stall semgrep
+            stderr_task = asyncio.create_task(proc.stderr.read())
+            
+            # Stream findings out of stdout instead of buffering the whole report,
+            # setting a canonical top-level severity on each one as it arrives
+            findings, codes = [], []
+            parse_error = None
+            try:
+                async for finding in ijson.items(proc.stdout, "results.item", use_float=True):
+                    code = severity_code(finding.get("extra", {}).get("severity"))
+                    finding["severity"] = SEVERITY_LEVELS[code]
+                    findings.append(finding)
+                    codes.append(code)
+            except ijson.JSONError as e:
+                parse_error = e
+                await proc.stdout.read()
+            
+            stderr = await stderr_task
+            await proc.wait()
+
+        if proc.returncode != 0:
+            error = stderr.decode(errors="replace")
+            logger.error(f"Semgrep error: {error}")
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail=f"Semgrep scan failed: {error}"
+            )
         
-        results = json.loads(result.stdout)
+        if parse_error is not None:
+            logger.error(f"Failed to parse semgrep output: {str(parse_error)}")
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail="Failed to parse semgrep output"
+            )
         
-        if "results" in results:
-            logger.info(f"Found {len(results['results'])} vulnerabilities")
-            return results["results"]
-        logger.info("No vulnerabilities found")
-        return []
+        if findings:
+            logger.info(f"Found {len(findings)} vulnerabilities")
+        else:
+            logger.info("No vulnerabilities found")
+        return findings, codes
         
-    except subprocess.CalledProcessError as e:
-        logger.error(f"Semgrep error: {e.stderr}")
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"Semgrep scan failed: {e.stderr}"
-        )
-    except json.JSONDecodeError as e:
-        logger.error(f"Failed to parse semgrep output: {str(e)}")
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail="Failed to parse semgrep output"
-        )
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Unexpected error in semgrep scan: {str(e)}")
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Unexpected error during scan"
-        ) 
\ No newline at end of file
+        )
@@ -1,12 +1,12 @@
+import asyncio
 from supabase import create_client
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional
 import logging
 from fastapi import HTTPException, status
-from app.core.config import get_settings
+from app.core.config import settings
 from datetime import datetime
 
 logger = logging.getLogger(__name__)
-settings = get_settings()
 
 # Initialize Supabase client
 try:
@@ -16,6 +16,9 @@ except Exception as e:
     logger.error(f"Failed to initialize Supabase client: {str(e)}")
     raise
 
+# Fields added to each stored vulnerability by enhance_vulnerability_data
+ENHANCEMENT_FIELDS = frozenset(("risk_severity", "exploitability", "impact", "detection_timestamp"))
+
 def enhance_vulnerability_data(vulnerability: Dict[str, Any]) -> Dict[str, Any]:
     """Enhance vulnerability data with risk severity and exploitability context."""
     severity = vulnerability.get("extra", {}).get("severity", "INFO")
@@ -49,38 +52,54 @@ def enhance_vulnerability_data(vulnerability: Dict[str, Any]) -> Dict[str, Any]:
         "detection_timestamp": datetime.utcnow().isoformat()
     }
 
-def store_scan_results(data: Dict[str, Any]) -> Dict[str, Any]:
-    """Store scan results in Supabase and return the inserted record."""
+def prepare_scan_data(data: Dict[str, Any]) -> Dict[str, Any]:
+    """Build the scan_history row for a set of scan results."""
+    # Enhance vulnerability data
+    enhanced_vulnerabilities = [
+        enhance_vulnerability_data(vuln) 
+        for vuln in data.get("vulnerabilities", [])
+    ]
+    
+    # Prepare scan history data
+    return {
+        "file_name": data["file_name"],
+        "scan_timestamp": datetime.utcnow().isoformat(),
+        "vulnerabilities": enhanced_vulnerabilities,
+        "severity_count": data["severity_count"],
+        "total_vulnerabilities": data["total_vulnerabilities"],
+        "security_score": data["security_score"],
+        "scan_status": "completed",
+        "scan_duration": data.get("scan_duration", 0),
+        "scan_metadata": {
+            "tool_version": data.get("tool_version", "unknown"),
+            "scan_type": "SAST",
+            "environment": data.get("environment", "development"),
+            "content_hash": data.get("content_hash"),
+            "scan_mode": data.get("scan_mode"),
+            "semgrep_config": data.get("semgrep_config")
+        }
+    }
+
+async def store_scan_results(data: Dict[str, Any]) -> Dict[str, Any]:
+    """Store scan results in Supabase without blocking the event loop."""
+    stored = await asyncio.to_thread(_store_scan_results_bulk, [data])
+    return stored[0]
+
+async def store_scan_results_bulk(records: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Store several scan results in Supabase with a single insert."""
+    return await asyncio.to_thread(_store_scan_results_bulk, records)
+
+def _store_scan_results_bulk(records: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Store scan results in Supabase and return the inserted records in order."""
     try:
-        logger.info("Storing results in Supabase")
-        
-        # Enhance vulnerability data
-        enhanced_vulnerabilities = [
-            enhance_vulnerability_data(vuln) 
-            for vuln in data.get("vulnerabilities", [])
-        ]
+        logger.info(f"Storing {len(records)} results in Supabase")
         
-        # Prepare scan history data
-        scan_data = {
-            "file_name": data["file_name"],
-            "scan_timestamp": datetime.utcnow().isoformat(),
-            "vulnerabilities": enhanced_vulnerabilities,
-            "severity_count": data["severity_count"],
-            "total_vulnerabilities": data["total_vulnerabilities"],
-            "security_score": data["security_score"],
-            "scan_status": "completed",
-            "scan_duration": data.get("scan_duration", 0),
-            "scan_metadata": {
-                "tool_version": data.get("tool_version", "unknown"),
-                "scan_type": "SAST",
-                "environment": data.get("environment", "development")
-            }
-        }
+        scan_data = [prepare_scan_data(data) for data in records]
         
         # Store in scan_history table
         result = supabase.table("scan_history").insert(scan_data).execute()
         
-        if not result.data:
+        if not result.data or len(result.data) != len(scan_data):
             logger.error("Failed to store results in Supabase: No data returned")
             raise HTTPException(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -88,7 +107,7 @@ def store_scan_results(data: Dict[str, Any]) -> Dict[str, Any]:
             )
             
         logger.info("Successfully stored results in Supabase")
-        return result.data[0]
+        return result.data
         
     except Exception as e:
         logger.error(f"Error storing results in Supabase: {str(e)}")
@@ -97,7 +116,11 @@ def store_scan_results(data: Dict[str, Any]) -> Dict[str, Any]:
             detail=f"Database error: {str(e)}"
         )
 
-def get_scan_history(limit: int = 10, offset: int = 0) -> List[Dict[str, Any]]:
+async def get_scan_history(limit: int = 10, offset: int = 0) -> List[Dict[str, Any]]:
+    """Retrieve scan history with pagination without blocking the event loop."""
+    return await asyncio.to_thread(_get_scan_history, limit, offset)
+
+def _get_scan_history(limit: int = 10, offset: int = 0) -> List[Dict[str, Any]]:
     """Retrieve scan history with pagination."""
     try:
         result = supabase.table("scan_history") \
@@ -114,7 +137,11 @@ def get_scan_history(limit: int = 10, offset: int = 0) -> List[Dict[str, Any]]:
             detail=f"Error retrieving scan history: {str(e)}"
         )
 
-def get_scan_by_id(scan_id: str) -> Dict[str, Any]:
+async def get_scan_by_id(scan_id: str) -> Dict[str, Any]:
+    """Retrieve a specific scan by ID without blocking the event loop."""
+    return await asyncio.to_thread(_get_scan_by_id, scan_id)
+
+def _get_scan_by_id(scan_id: str) -> Dict[str, Any]:
     """Retrieve a specific scan by ID."""
     try:
         result = supabase.table("scan_history") \
@@ -128,4 +155,34 @@ def get_scan_by_id(scan_id: str) -> Dict[str, Any]:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Error retrieving scan: {str(e)}"
-        ) 
\ No newline at end of file
+        ) 
+
+async def get_scan_by_content_hash(content_hash: str, scan_mode: str, semgrep_config: str) -> Optional[Dict[str, Any]]:
+    """Retrieve the most recent matching scan of the given content without blocking the event loop."""
+    return await asyncio.to_thread(_get_scan_by_content_hash, content_hash, scan_mode, semgrep_config)
+
+def _get_scan_by_content_hash(content_hash: str, scan_mode: str, semgrep_config: str) -> Optional[Dict[str, Any]]:
+    """Retrieve the most recent scan of a file with the same content, extension and ruleset, if any."""
+    try:
+        result = supabase.table("scan_history") \
+            .select("vulnerabilities, severity_count, total_vulnerabilities, security_score") \
+            .eq("scan_metadata->>content_hash", content_hash) \
+            .eq("scan_metadata->>scan_mode", scan_mode) \
+            .eq("scan_metadata->>semgrep_config", semgrep_config) \
+            .order("scan_timestamp", desc=True) \
+            .limit(1) \
+            .execute()
+        if not result.data:
+            return None
+        
+        # Return the raw findings so they are enhanced exactly once when stored again
+        scan = result.data[0]
+        scan["vulnerabilities"] = [
+            {key: value for key, value in vuln.items() if key not in ENHANCEMENT_FIELDS}
+            for vuln in scan["vulnerabilities"]
+        ]
+        return scan
+    except Exception as e:
+        # A failed cache lookup should fall back to a fresh scan, not fail the upload
+        logger.warning(f"Error looking up cached scan: {str(e)}")
+        return None